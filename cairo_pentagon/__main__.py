@@ -0,0 +1,5 @@
+import sys
+
+from cairo_pentagon.cli import main
+
+sys.exit(main())
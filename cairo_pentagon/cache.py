@@ -0,0 +1,261 @@
+"""
+A content-addressed, on-disk cache of generated pieces and rendered images.
+
+A Piece is fully determined by its seed and size, so the hash of those inputs,
+together with any render settings, names the cached result. Entries are written
+atomically and the least recently used are evicted once the cache outgrows its
+size limit, so any number of processes may share one cache directory.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from typing import Any, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; the size record is then unlocked.
+    fcntl = None
+
+from cairo_pentagon import layer, piece
+from cairo_pentagon.utils import constants
+
+# Bump whenever the meaning of cached bytes changes, to orphan stale entries.
+_VERSION: int = 1
+_HEADER = struct.Struct("<I")
+# The shared record of the cache's total size, beside the shard directories.
+_SIZE_RECORD: str = ".size"
+# Eviction empties the cache to this fraction of its limit, so the directory is
+# only rescanned once per eighth of the limit written, not on every put.
+_LOW_WATER: float = 7 / 8
+
+
+class PieceCache:
+    def __init__(
+        self, directory: str, max_bytes: int = constants.DEFAULT_CACHE_BYTES
+    ):
+        self.directory: str = directory
+        self.max_bytes: int = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(**inputs: Any) -> str:
+        """
+        Return the content address for a set of generation or render inputs.
+
+        Arguments:
+            inputs: JSON serializable values, such as the seed, width, height,
+                and render settings, that fully determine the cached result.
+
+        Returns:
+            A hex digest naming the cache entry.
+        """
+        encoded = json.dumps(
+            {"version": _VERSION, **inputs}, sort_keys=True, separators=(",", ":")
+        )
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the bytes cached under key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as entry:
+                data = entry.read()
+        except FileNotFoundError:
+            return None
+        try:
+            # Touching the entry marks it as recently used.
+            os.utime(path)
+        except FileNotFoundError:
+            # Another process evicted it since; what was read is still good.
+            pass
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Atomically store data under key.
+
+        The entry is written to a temporary file beside its final path and
+        renamed into place, so readers never observe a partial entry. Its size
+        is then added to a running total shared, under a file lock, by every
+        process using the cache, and only once that total passes max_bytes is
+        the directory rescanned to evict entries.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            replaced = os.stat(path).st_size
+        except FileNotFoundError:
+            replaced = 0
+        handle, temporary = tempfile.mkstemp(prefix=".", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(handle, "wb") as entry:
+                entry.write(data)
+                entry.flush()
+                os.fsync(entry.fileno())
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+        # Entries removed behind the cache's back can only make the record
+        # overestimate, which at worst brings the next rescan forward.
+        with self._size_record() as record:
+            size = self._read_size(record)
+            if size is not None:
+                size += len(data) - replaced
+            if size is None or size > self.max_bytes:
+                size = self._evict(int(self.max_bytes * _LOW_WATER))
+            self._write_size(record, size)
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits."""
+        with self._size_record() as record:
+            self._write_size(record, self._evict(self.max_bytes))
+
+    @contextlib.contextmanager
+    def _size_record(self) -> Iterator[int]:
+        """Open and exclusively lock the shared size record."""
+        handle = os.open(
+            os.path.join(self.directory, _SIZE_RECORD), os.O_RDWR | os.O_CREAT
+        )
+        try:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            yield handle
+        finally:
+            # Closing the file releases the lock.
+            os.close(handle)
+
+    @staticmethod
+    def _read_size(record: int) -> Optional[int]:
+        """Return the recorded size, or None if it has never been recorded."""
+        os.lseek(record, 0, os.SEEK_SET)
+        try:
+            return int(os.read(record, 32))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _write_size(record: int, size: int) -> None:
+        os.ftruncate(record, 0)
+        os.lseek(record, 0, os.SEEK_SET)
+        os.write(record, str(size).encode("ascii"))
+
+    def _evict(self, target: int) -> int:
+        """
+        Scan the whole cache and remove the least recently used entries until
+        it holds at most target bytes.
+
+        Returns:
+            The size of the entries left behind.
+        """
+        entries: List[Tuple[float, int, str]] = []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                # Another process evicted it first.
+                pass
+            size -= entry_size
+        return size
+
+    def get_piece(self, key: str) -> Optional[piece.Piece]:
+        """Return the piece cached under key, or None on a miss."""
+        data = self.get(key)
+        return None if data is None else decode_piece(data)
+
+    def put_piece(self, key: str, this_piece: piece.Piece) -> None:
+        """Store the layer visibility of a constructed piece under key."""
+        self.put(key, encode_piece(this_piece))
+
+
+def encode_piece(this_piece: piece.Piece) -> bytes:
+    """
+    Serialize a constructed piece as a small JSON header of piece and layer
+    attributes, followed by the visibility arrays of each layer.
+    """
+    header = {
+        "width": this_piece.width,
+        "height": this_piece.height,
+        "periodic": this_piece.periodic,
+        "seed": this_piece.seed,
+        "background_color": this_piece.background_color,
+        "layers": [
+            {
+                "init_shape": this_layer.shape,
+                "width": this_layer.width,
+                "height": this_layer.height,
+                "color": this_layer.color,
+                "opacity": this_layer.opacity,
+                "periodic": this_layer.periodic,
+            }
+            for this_layer in this_piece.layers
+        ],
+    }
+    encoded = json.dumps(header).encode("utf-8")
+    parts = [_HEADER.pack(len(encoded)), encoded]
+    for this_layer in this_piece.layers:
+        parts.extend(bytes(array) for array in this_layer.visibility_arrays())
+    return b"".join(parts)
+
+
+def decode_piece(data: bytes) -> piece.Piece:
+    """
+    Rebuild a piece serialized by encode_piece.
+
+    The layers are rebuilt from their visibility arrays alone, as views into
+    data rather than copies of it.
+    """
+    (header_size,) = _HEADER.unpack_from(data)
+    offset = _HEADER.size + header_size
+    header = json.loads(bytes(data[_HEADER.size : offset]))
+
+    decoded = piece.Piece(
+        width=header["width"],
+        height=header["height"],
+        periodic=header["periodic"],
+        seed=header["seed"],
+    )
+    background_color = header["background_color"]
+    decoded.background_color = background_color and tuple(background_color)
+    decoded.layers = []
+    view = memoryview(data)
+    for description in header["layers"]:
+        vertical_size = description["height"] * (description["width"] + 1)
+        horizontal_size = (description["height"] + 1) * description["width"]
+        middle = offset + vertical_size
+        decoded.layers.append(
+            layer.Layer.from_visibility_arrays(
+                view[offset:middle],
+                view[middle : middle + horizontal_size],
+                init_shape=description["init_shape"],
+                width=description["width"],
+                height=description["height"],
+                color=tuple(description["color"]),
+                opacity=description["opacity"],
+                periodic=description["periodic"],
+            )
+        )
+        offset = middle + horizontal_size
+    return decoded
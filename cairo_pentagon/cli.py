@@ -0,0 +1,335 @@
+"""
+The cairo-pentagon command: a batch generator for a range of seeds.
+
+Every seed is generated in a pool of worker processes, optionally scored,
+filtered and rendered, and written as one JSON record per line, in seed order.
+Workers write rendered images to disk themselves, and only a few batches of
+seeds per worker are submitted ahead of the output, so memory stays bounded
+however long the range and however slowly the records are read. Throughput,
+in pieces and pentagons per second, and the mean time of each stage are
+reported to stderr as the batch runs.
+"""
+import argparse
+import base64
+import collections
+import json
+import multiprocessing
+import multiprocessing.pool
+import os
+import sys
+import time
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from cairo_pentagon import cache, piece, render, service
+from cairo_pentagon.utils import constants
+
+Record = Dict[str, Any]
+
+# The batches of seeds each worker may have queued or finished but unwritten.
+_BATCHES_PER_WORKER: int = 4
+
+# The parsed arguments and shared cache, installed in each worker process by
+# _initialize.
+_options: Optional[argparse.Namespace] = None
+_cache: Optional[cache.PieceCache] = None
+
+
+def parse_seeds(value: str) -> range:
+    """Parse a seed range written as 'STOP' or 'START:STOP'."""
+    try:
+        start, _, stop = value.rpartition(":")
+        seeds = range(int(start or 0), int(stop))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid seed range {value!r}.")
+    if not seeds:
+        raise argparse.ArgumentTypeError(f"The seed range {value!r} is empty.")
+    return seeds
+
+
+def positive_int(value: str) -> int:
+    """Parse a count or size, which must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid integer {value!r}.")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a positive integer.")
+    return number
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="cairo-pentagon",
+        description="Generate, score, filter and render a range of pieces.",
+    )
+    parser.add_argument(
+        "--seeds", type=parse_seeds, default=range(1), help="START:STOP or STOP."
+    )
+    parser.add_argument(
+        "--width", type=positive_int, default=constants.DEFAULT_PIECE_WIDTH
+    )
+    parser.add_argument(
+        "--height", type=positive_int, default=constants.DEFAULT_PIECE_HEIGHT
+    )
+    parser.add_argument("--periodic", action="store_true")
+    parser.add_argument(
+        "--shape", choices=constants.Shape.SHAPES, default=constants.Shape.ALPHA
+    )
+
+    scoring = parser.add_argument_group("scoring")
+    scoring.add_argument(
+        "--score", action="store_true", help="Record each piece's coverage."
+    )
+    scoring.add_argument("--min-score", type=float, default=None)
+    scoring.add_argument("--max-score", type=float, default=None)
+
+    rendering = parser.add_argument_group("rendering")
+    rendering.add_argument(
+        "--render", metavar="DIRECTORY", help="Write a PPM image of each piece."
+    )
+    rendering.add_argument(
+        "--cell-size", type=positive_int, default=constants.DEFAULT_CELL_SIZE
+    )
+    rendering.add_argument(
+        "--preview-factor",
+        type=positive_int,
+        default=None,
+        help="Render block previews.",
+    )
+    rendering.add_argument(
+        "--tiles",
+        type=positive_int,
+        nargs=2,
+        default=(1, 1),
+        metavar=("COLUMNS", "ROWS"),
+    )
+
+    output = parser.add_argument_group("output")
+    output.add_argument(
+        "--output", metavar="FILE", help="Write records here instead of stdout."
+    )
+    output.add_argument(
+        "--with-piece",
+        action="store_true",
+        help="Embed each encoded piece, base64, in its record.",
+    )
+    output.add_argument("--cache", metavar="DIRECTORY", help="A PieceCache to share.")
+    output.add_argument(
+        "--workers",
+        type=positive_int,
+        default=os.cpu_count() or 1,
+        help="Worker processes.",
+    )
+    output.add_argument(
+        "--report-interval", type=float, default=1.0, help="Seconds between reports."
+    )
+    return parser
+
+
+def _initialize(options: argparse.Namespace) -> None:
+    global _options, _cache
+    _options = options
+    _cache = cache.PieceCache(options.cache) if options.cache else None
+
+
+def _generate(seed: int) -> Record:
+    """Generate, score, filter and render the piece for one seed."""
+    options = _options
+    timings: Dict[str, float] = {}
+    record: Record = {"seed": seed, "width": options.width, "height": options.height}
+
+    clock = time.perf_counter()
+    job = service.normalize_job(
+        {
+            "seed": seed,
+            "width": options.width,
+            "height": options.height,
+            "periodic": options.periodic,
+            "shape": options.shape,
+        }
+    )
+    if options.cache:
+        # Keyed exactly as the service keys its jobs, so they share entries.
+        this_piece = cache.decode_piece(service.run_job(job, options.cache))
+    else:
+        this_piece = piece.Piece(
+            width=options.width,
+            height=options.height,
+            periodic=options.periodic,
+            seed=seed,
+        )
+        this_piece.construct_piece(options.shape)
+    record["pentagons"] = sum(l.pentagon_count for l in this_piece.layers)
+    timings["construct"], clock = time.perf_counter() - clock, time.perf_counter()
+
+    record["kept"] = True
+    if options.score or options.min_score is not None or options.max_score is not None:
+        record["score"] = score = this_piece.coverage()
+        timings["score"], clock = time.perf_counter() - clock, time.perf_counter()
+        if options.min_score is not None and score < options.min_score:
+            record["kept"] = False
+        if options.max_score is not None and score > options.max_score:
+            record["kept"] = False
+
+    if record["kept"] and options.render:
+        record["image"] = _render(this_piece, job)
+        timings["render"], clock = time.perf_counter() - clock, time.perf_counter()
+
+    if record["kept"] and options.with_piece:
+        encoded = cache.encode_piece(this_piece)
+        record["piece"] = base64.b64encode(encoded).decode("ascii")
+        timings["encode"] = time.perf_counter() - clock
+
+    record["timings"] = timings
+    return record
+
+
+def _render(this_piece: piece.Piece, job: service.Job) -> str:
+    """Render a piece to the image directory, through the cache if there is one."""
+    options = _options
+    job = dict(
+        job,
+        render={
+            "cell_size": options.cell_size,
+            "preview_factor": options.preview_factor,
+            "tiles": list(options.tiles),
+        },
+    )
+    key = cache.PieceCache.key(**job)
+
+    data = _cache.get(key) if _cache else None
+    if data is None:
+        renderer = render.Renderer(options.cell_size)
+        if options.preview_factor:
+            canvas = renderer.render_preview(this_piece, options.preview_factor)
+        else:
+            canvas = renderer.render(this_piece, tiles=tuple(options.tiles))
+        data = canvas.to_ppm()
+        if _cache:
+            _cache.put(key, data)
+
+    path = os.path.join(options.render, f"{job['seed']}.ppm")
+    with open(path, "wb") as image:
+        image.write(data)
+    return path
+
+
+def _generate_batch(seeds: range) -> List[Record]:
+    return [_generate(seed) for seed in seeds]
+
+
+def _imap_bounded(
+    pool: multiprocessing.pool.Pool, seeds: range, workers: int
+) -> Iterator[Record]:
+    """
+    Like pool.imap(_generate, seeds), but submit only a bounded window of
+    batches ahead of the one being consumed, rather than the whole range.
+    """
+    size = max(1, min(64, len(seeds) // (_BATCHES_PER_WORKER * workers)))
+    pending: Deque[multiprocessing.pool.AsyncResult] = collections.deque()
+    for start in range(0, len(seeds), size):
+        batch = seeds[start : start + size]
+        pending.append(pool.apply_async(_generate_batch, (batch,)))
+        if len(pending) >= _BATCHES_PER_WORKER * workers:
+            yield from pending.popleft().get()
+    while pending:
+        yield from pending.popleft().get()
+
+
+class Throughput:
+    """Running totals of a batch, reported as rates and mean stage timings."""
+
+    def __init__(self, stream: TextIO):
+        self.stream: TextIO = stream
+        self.start: float = time.perf_counter()
+        self.pieces: int = 0
+        self.kept: int = 0
+        self.pentagons: int = 0
+        # The total seconds spent in each stage, and the number of pieces that
+        # ran it: filtered out pieces are neither rendered nor encoded.
+        self.stages: Dict[str, float] = {}
+        self.runs: Dict[str, int] = {}
+        self._last_report: float = self.start
+
+    def add(self, record: Record, kept: bool) -> None:
+        self.pieces += 1
+        self.kept += kept
+        self.pentagons += record["pentagons"]
+        for stage, seconds in record["timings"].items():
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+            self.runs[stage] = self.runs.get(stage, 0) + 1
+
+    def report(self, interval: float = 0.0) -> None:
+        """Write a progress line, if interval seconds have passed since the last."""
+        now = time.perf_counter()
+        if now - self._last_report < interval:
+            return
+        self._last_report = now
+        elapsed = max(now - self.start, 1e-9)
+        stages = " ".join(
+            f"{stage} {1000 * seconds / self.runs[stage]:.2f}ms"
+            for stage, seconds in self.stages.items()
+        )
+        self.stream.write(
+            f"{self.pieces} pieces ({self.kept} kept) in {elapsed:.1f}s | "
+            f"{self.pieces / elapsed:.1f} pieces/s | "
+            f"{self.pentagons / elapsed:.0f} pentagons/s | {stages}\n"
+        )
+        self.stream.flush()
+
+
+def _write(
+    records: Iterable[Record], output: TextIO, throughput: Throughput, interval: float
+) -> None:
+    for record in records:
+        kept = record.pop("kept")
+        throughput.add(record, kept)
+        if kept:
+            output.write(json.dumps(record) + "\n")
+        throughput.report(interval)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    options = parser.parse_args(argv)
+    if max(options.width, options.height) > constants.MAX_PIECE_SIZE:
+        parser.error(
+            f"--width and --height must be at most {constants.MAX_PIECE_SIZE}."
+        )
+    if options.periodic and (options.width % 2 or options.height % 2):
+        parser.error("--periodic requires an even --width and --height.")
+    if tuple(options.tiles) != (1, 1) and not options.periodic:
+        parser.error("--tiles requires --periodic.")
+    if options.render:
+        os.makedirs(options.render, exist_ok=True)
+
+    output = open(options.output, "w") if options.output else sys.stdout
+    throughput = Throughput(sys.stderr)
+    try:
+        if options.workers <= 1:
+            _initialize(options)
+            _write(
+                map(_generate, options.seeds),
+                output,
+                throughput,
+                options.report_interval,
+            )
+        else:
+            with multiprocessing.Pool(
+                options.workers, initializer=_initialize, initargs=(options,)
+            ) as pool:
+                _write(
+                    _imap_bounded(pool, options.seeds, options.workers),
+                    output,
+                    throughput,
+                    options.report_interval,
+                )
+    except BrokenPipeError:
+        # The reader went away, e.g. `cairo-pentagon | head`; stop quietly.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    throughput.report()
+    return 0
@@ -1,4 +1,4 @@
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterator, Optional, Tuple
 
 from cairo_pentagon.pentagon import Pentagon
 from cairo_pentagon.utils import constants, typing
@@ -21,6 +21,12 @@ class Layer:
 
     These two shapes will selectively alternate as the layer is constructed to
     build the Cairo Pentagon pattern.
+
+    A periodic layer wraps toroidally: the pentagons that straddle the right
+    and bottom edges of the lattice are identified with those on the left and
+    top edges, so the layer is a single fundamental tile of a seamless
+    wallpaper. Because the shapes alternate, a periodic layer must have an even
+    width and height.
     """
 
     _shape_to_pentagons: Dict[typing.Shape, Tuple[typing.Orientation]] = {
@@ -49,12 +55,21 @@ class Layer:
         height: typing.Height = constants.DEFAULT_HEIGHT,
         color: typing.Color = constants.Colors.RED,
         opacity: typing.Opacity = constants.DEFAULT_OPACITY,
+        periodic: bool = False,
     ):
+        if periodic and (width % 2 or height % 2):
+            raise ValueError(
+                f"A periodic layer must have an even width and height, got "
+                f"{width} x {height}."
+            )
         self._init_shape: typing.Shape = init_shape
         self.width: typing.Width = width
         self.height: typing.Height = height
+        self.periodic: bool = periodic
 
         self._pentagon_map: Optional[Dict[typing.Key, Pentagon]] = None
+        # Packed visibility for a layer rebuilt without its pentagon objects.
+        self._visibility: Optional[Tuple[typing.Buffer, typing.Buffer]] = None
 
         # rendering characteristics
         self.color: typing.Color = color
@@ -112,6 +127,8 @@ class Layer:
             key: typing.Key = Pentagon.define_unique_key(
                 orientation=orientation, shape=shape, row=row, column=column
             )
+            if self.periodic:
+                key = self._wrap_key(key)
             if key not in self._pentagon_map:
                 # Get the class constructor for the pentagon we need to build.
                 factory = Pentagon.get_subclass_from_orientation(orientation)
@@ -120,5 +137,124 @@ class Layer:
                 # Add to our dict of unique key to pentagon.
                 self._pentagon_map.update({key: pentagon})
 
+    @classmethod
+    def from_visibility_arrays(
+        cls,
+        vertical: typing.Buffer,
+        horizontal: typing.Buffer,
+        init_shape: typing.Shape = constants.Shape.ALPHA,
+        width: typing.Width = constants.DEFAULT_WIDTH,
+        height: typing.Height = constants.DEFAULT_HEIGHT,
+        color: typing.Color = constants.Colors.RED,
+        opacity: typing.Opacity = constants.DEFAULT_OPACITY,
+        periodic: bool = False,
+    ) -> "Layer":
+        """
+        Build a layer straight from packed visibility arrays, without creating
+        any Pentagon objects. The arrays are used as is, not copied.
+        """
+        new_layer = cls(init_shape, width, height, color, opacity, periodic)
+        new_layer._visibility = (vertical, horizontal)
+        return new_layer
+
+    @property
+    def visibility_sizes(self) -> Tuple[int, int]:
+        """The lengths of the vertical and horizontal visibility arrays."""
+        return self.height * (self.width + 1), (self.height + 1) * self.width
+
+    @property
+    def pentagon_count(self) -> int:
+        """The number of pentagons in the layer, once constructed."""
+        if self.periodic:
+            return 2 * self.width * self.height
+        return 2 * self.width * self.height + self.width + self.height
+
+    def visible_fraction(self) -> float:
+        """The share of the layer's pentagons that are visible."""
+        vertical, horizontal = self.visibility_arrays()
+        visible = bytes(vertical).count(1) + bytes(horizontal).count(1)
+        return visible / self.pentagon_count
+
+    def visibility_arrays(self) -> Tuple[typing.Buffer, typing.Buffer]:
+        """
+        Pack the visibility of every pentagon into two arrays indexed by the
+        cell edge each pentagon straddles.
+
+        Returns:
+            The vertical edge array, height rows of width + 1 edges, and the
+            horizontal edge array, height + 1 rows of width edges. Edge i of a
+            row lies on the left side of cell i; a value of 1 is visible.
+        """
+        if self._pentagon_map is None and self._visibility is not None:
+            return self._visibility
+        vertical, horizontal = map(bytearray, self.visibility_sizes)
+        self.pack_visibility(vertical, horizontal)
+        return vertical, horizontal
+
+    def pack_visibility(
+        self, vertical: typing.Buffer, horizontal: typing.Buffer
+    ) -> None:
+        """Write the visibility arrays into the provided writable buffers."""
+        if self._pentagon_map is None and self._visibility is not None:
+            vertical[:], horizontal[:] = self._visibility
+            return
+        vertical[:] = bytes(len(vertical))
+        horizontal[:] = bytes(len(horizontal))
+        for (orientation, row, column), pentagon in self._pentagon_map.items():
+            if not pentagon.is_visible():
+                continue
+            if orientation in constants.Orientation.VERTICAL:
+                vertical[row * (self.width + 1) + column[0] + 1] = 1
+            else:
+                horizontal[(row[0] + 1) * self.width + column] = 1
+
+    def visible_keys(self) -> Iterator[typing.Key]:
+        """Yield the unique key of every visible pentagon in the layer."""
+        if self._pentagon_map is not None:
+            for key, pentagon in self._pentagon_map.items():
+                if pentagon.is_visible():
+                    yield key
+            return
+
+        # Recover each key from its edge: the orientation of the pentagon is
+        # fixed by the shape of the cell on its left or upper side.
+        vertical, horizontal = self.visibility_arrays()
+        for index, visible in enumerate(vertical):
+            if visible:
+                row, edge = divmod(index, self.width + 1)
+                orientation = (
+                    constants.Orientation.UP
+                    if self._cell_shape(row, edge - 1) == constants.Shape.ALPHA
+                    else constants.Orientation.DOWN
+                )
+                yield self._edge_key((orientation, row, (edge - 1, edge)))
+        for index, visible in enumerate(horizontal):
+            if visible:
+                edge, column = divmod(index, self.width)
+                orientation = (
+                    constants.Orientation.RIGHT
+                    if self._cell_shape(edge - 1, column) == constants.Shape.ALPHA
+                    else constants.Orientation.LEFT
+                )
+                yield self._edge_key((orientation, (edge - 1, edge), column))
+
+    def _cell_shape(self, row: typing.Row, column: typing.Column) -> typing.Shape:
+        if (row + column) % 2 == 0:
+            return self.shape
+        return self._shape_shift[self.shape]
+
+    def _edge_key(self, key: typing.Key) -> typing.Key:
+        return self._wrap_key(key) if self.periodic else key
+
+    def _wrap_key(self, key: typing.Key) -> typing.Key:
+        """Fold a key's compound dimension back onto the toroidal lattice."""
+        orientation, row, column = key
+        if orientation in constants.Orientation.VERTICAL:
+            column = (column[0] % self.width, column[1] % self.width)
+        else:
+            row = (row[0] % self.height, row[1] % self.height)
+        return orientation, row, column
+
     def reset(self):
         self.pentagon_map = None
+        self._visibility = None
@@ -12,9 +12,17 @@ class Piece:
     _num_layers: int = 3
     _seed: int = 324
 
-    def __init__(self, width: typing.Width = 12, height: typing.Height = 15):
+    def __init__(
+        self,
+        width: typing.Width = constants.DEFAULT_PIECE_WIDTH,
+        height: typing.Height = constants.DEFAULT_PIECE_HEIGHT,
+        periodic: bool = False,
+        seed: Optional[int] = None,
+    ):
         self.width = width
         self.height = height
+        # Periodic pieces are a single tile of a seamless wallpaper.
+        self.periodic = periodic
 
         # Three individual Layer objects: A, B, & C.
         self.layers: Optional[List[layer.Layer]] = None
@@ -24,7 +32,8 @@ class Piece:
 
         # The color of the background rectangle.
         self.background_color: Optional[typing.Color] = None
-        self.randomizer = randomizer.Randomizer(seed=self._seed)
+        self.seed = seed if seed is not None else self._seed
+        self.randomizer = randomizer.Randomizer(seed=self.seed)
 
     @property
     def patterns(self) -> Optional[List[pattern.Pattern]]:
@@ -42,12 +51,18 @@ class Piece:
     def layers(self, value) -> None:
         self._layers = value
 
-    def _add_layers(self):
+    def _add_layers(self, shape: typing.Shape = constants.Shape.ALPHA):
         if self.layers:
             raise RuntimeError("Layers already exist, cannot overwrite.")
         self.layers = []
         for _ in range(3):
-            new_layer = layer.Layer(height=self.height, width=self.width)
+            new_layer = layer.Layer(
+                init_shape=shape,
+                height=self.height,
+                width=self.width,
+                color=self.randomizer.get_color(),
+                periodic=self.periodic,
+            )
             new_layer.construct_layer()
             self.layers.append(new_layer)
 
@@ -71,7 +86,14 @@ class Piece:
                 pentagon.visibility = this_pattern.apply(pentagon)
 
     def construct_piece(self, shape: typing.Shape = constants.Shape.ALPHA) -> None:
-        pass
+        """Build the layers and patterns, then apply each pattern to its layer."""
+        self._add_layers(shape)
+        self._add_patterns()
+        self.apply_patterns()
+
+    def coverage(self) -> float:
+        """Score the piece by the mean share of visible pentagons per layer."""
+        return sum(l.visible_fraction() for l in self.layers) / len(self.layers)
 
     @classmethod
     def manual_build(
@@ -0,0 +1,334 @@
+"""
+Rasterizes the layers of a Piece onto an RGB canvas.
+"""
+import functools
+import math
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from cairo_pentagon import layer
+from cairo_pentagon.utils import constants, typing
+
+# Half the length of the segment drawn through the center of every cell, as a
+# fraction of the cell's side. Alpha cells hold a vertical segment and beta
+# cells a horizontal one; joining each end of a segment to the two nearest
+# corners of its cell cuts the lattice into Cairo pentagons.
+_SEGMENT: float = (math.sqrt(3) - 1) / 2
+
+Point = Tuple[float, float]
+Span = Tuple[int, int, int]
+
+# The sides of a cell, clockwise from the top.
+_SIDES: Tuple[str, ...] = ("top", "right", "bottom", "left")
+
+
+def pentagon_vertices(key: typing.Key) -> List[Point]:
+    """
+    Return the vertices of the pentagon uniquely identified by key.
+
+    Every pentagon straddles the edge shared by two neighbouring cells: the
+    cell whose center segment is parallel to the edge contributes a
+    trapezoid, and the other cell a triangle. The orientation of the key tells
+    us which side of the edge each cell is on.
+
+    Arguments:
+        key (typing.Key): (orientation, row, column) as built by
+            Pentagon.define_unique_key, one of row or column compound.
+
+    Returns:
+        The (x, y) vertices of the pentagon in cell units.
+    """
+    orientation, row, column = key
+    if orientation in constants.Orientation.VERTICAL:
+        # The edge is vertical, between the cells at column[0] and column[1].
+        edge, middle = column[0] + 1, row + 0.5
+        alpha_side = -1 if orientation == constants.Orientation.UP else 1
+        stem = edge + alpha_side * 0.5
+        tip = edge - alpha_side * (0.5 - _SEGMENT)
+        return [
+            (stem, middle - _SEGMENT),
+            (edge, row),
+            (tip, middle),
+            (edge, row + 1),
+            (stem, middle + _SEGMENT),
+        ]
+    # The edge is horizontal, between the cells at row[0] and row[1].
+    edge, middle = row[0] + 1, column + 0.5
+    alpha_side = -1 if orientation == constants.Orientation.RIGHT else 1
+    stem = edge - alpha_side * 0.5
+    tip = edge + alpha_side * (0.5 - _SEGMENT)
+    return [
+        (middle - _SEGMENT, stem),
+        (column, edge),
+        (middle, tip),
+        (column + 1, edge),
+        (middle + _SEGMENT, stem),
+    ]
+
+
+def polygon_spans(
+    vertices: Sequence[Point], width: int, height: int
+) -> Iterator[Span]:
+    """
+    Yield the (y, start, stop) pixel runs covered by a polygon.
+
+    A pixel is covered when its center falls inside the polygon. Edges are
+    half-open, so pentagons sharing an edge never both claim a pixel.
+    """
+    edges = []
+    for (x0, y0), (x1, y1) in zip(vertices, list(vertices[1:]) + [vertices[0]]):
+        if y0 == y1:
+            continue
+        if y0 > y1:
+            x0, y0, x1, y1 = x1, y1, x0, y0
+        edges.append((x0, y0, (x1 - x0) / (y1 - y0), y1))
+
+    ys = [y for _, y in vertices]
+    top = max(math.ceil(min(ys) - 0.5), 0)
+    bottom = min(math.ceil(max(ys) - 0.5), height)
+    for y in range(top, bottom):
+        sample = y + 0.5
+        crossings = sorted(
+            x0 + (sample - y0) * slope
+            for x0, y0, slope, y1 in edges
+            if y0 <= sample < y1
+        )
+        for start, stop in zip(crossings[::2], crossings[1::2]):
+            start = max(math.ceil(start - 0.5), 0)
+            stop = min(math.ceil(stop - 0.5), width)
+            if start < stop:
+                yield y, start, stop
+
+
+@functools.lru_cache(maxsize=None)
+def block_spans(block: int) -> Dict[str, List[Span]]:
+    """
+    Split a block of block x block pixels into four coarse triangles, one per
+    side of the cell, by assigning each pixel to the nearest side.
+
+    Two neighbouring cells' triangles meet across their shared edge in a
+    diamond that stands in for the pentagon straddling that edge. Ties on the
+    diagonals are broken with a slight clockwise twist, so every pixel of the
+    block belongs to exactly one side.
+
+    Returns:
+        A mapping of side to the (y, start, stop) pixel runs it covers.
+    """
+    spans: Dict[str, List[Span]] = {side: [] for side in _SIDES}
+    for y in range(block):
+        owners = []
+        for x in range(block):
+            dx, dy = (x + 0.5) / block - 0.5, (y + 0.5) / block - 0.5
+            dx, dy = dx - 1e-6 * dy, dy + 1e-6 * dx
+            distances = (0.5 + dy, 0.5 - dx, 0.5 - dy, 0.5 + dx)
+            owners.append(_SIDES[distances.index(min(distances))])
+        start = 0
+        for x in range(1, block + 1):
+            if x == block or owners[x] != owners[start]:
+                spans[owners[start]].append((y, start, x))
+                start = x
+    return spans
+
+
+def blend_tables(color: typing.Color, opacity: typing.Opacity) -> List[bytes]:
+    """Return one 256 byte lookup table per channel for painting color."""
+    return [
+        bytes(
+            round(value * (1 - opacity) + channel * opacity) for value in range(256)
+        )
+        for channel in color
+    ]
+
+
+class Canvas:
+    """
+    An RGB raster, stored as one plane of bytes per channel.
+
+    Keeping the channels apart lets a run of pixels be composited with a single
+    bytes.translate call per channel, rather than a Python loop per pixel.
+    """
+
+    def __init__(
+        self, width: int, height: int, color: typing.Color = constants.Colors.WHITE
+    ):
+        self.width: int = width
+        self.height: int = height
+        self.planes: List[bytearray] = [
+            bytearray([channel]) * (width * height) for channel in color
+        ]
+
+    @classmethod
+    def from_planes(cls, width: int, height: int, planes: List[bytearray]):
+        canvas = cls(0, 0)
+        canvas.width, canvas.height, canvas.planes = width, height, planes
+        return canvas
+
+    def pixel(self, x: int, y: int) -> typing.Color:
+        index = y * self.width + x
+        return tuple(plane[index] for plane in self.planes)
+
+    def blend(self, y: int, start: int, stop: int, tables: List[bytes]) -> None:
+        """Composite the pixels [start, stop) of row y through tables."""
+        start, stop = y * self.width + start, y * self.width + stop
+        for plane, table in zip(self.planes, tables):
+            plane[start:stop] = plane[start:stop].translate(table)
+
+    def tile(self, columns: int, rows: int) -> "Canvas":
+        """Return a new canvas holding columns x rows copies of this one."""
+        planes = []
+        for plane in self.planes:
+            band = b"".join(
+                plane[start : start + self.width] * columns
+                for start in range(0, len(plane), self.width)
+            )
+            planes.append(bytearray(band * rows))
+        return self.from_planes(self.width * columns, self.height * rows, planes)
+
+    def to_ppm(self) -> bytes:
+        """Encode the canvas as a binary PPM image."""
+        pixels = bytearray(self.width * self.height * 3)
+        for channel, plane in enumerate(self.planes):
+            pixels[channel::3] = plane
+        header = f"P6\n{self.width} {self.height}\n255\n".encode("ascii")
+        return header + bytes(pixels)
+
+
+class Renderer:
+    """
+    Draws a Piece: the background, then each layer's visible pentagons in order,
+    painted in the layer's color at the layer's opacity.
+    """
+
+    def __init__(self, cell_size: int = constants.DEFAULT_CELL_SIZE):
+        self.cell_size: int = cell_size
+
+    def render(self, piece, tiles: Tuple[int, int] = (1, 1)) -> Canvas:
+        """
+        Rasterize a constructed piece.
+
+        A piece built from periodic layers is a fundamental tile of a
+        wallpaper. It is rasterized exactly once and then copied to fill the
+        canvas, so the cost of a large wallpaper is one tile plus a memcpy.
+
+        Arguments:
+            piece (Piece): a piece whose layers have been constructed.
+            tiles (Tuple[int, int]): the number of (columns, rows) of tiles.
+
+        Returns:
+            The rendered Canvas.
+        """
+        if not piece.layers:
+            raise RuntimeError("The piece has no layers to render.")
+        if tuple(tiles) != (1, 1) and not all(l.periodic for l in piece.layers):
+            raise RuntimeError("Only a piece of periodic layers can be tiled.")
+
+        canvas = Canvas(
+            piece.width * self.cell_size,
+            piece.height * self.cell_size,
+            piece.background_color or constants.Colors.WHITE,
+        )
+        for this_layer in piece.layers:
+            self._render_layer(canvas, this_layer)
+
+        if tuple(tiles) != (1, 1):
+            canvas = canvas.tile(*tiles)
+        return canvas
+
+    def render_preview(
+        self, piece, factor: int = constants.DEFAULT_PREVIEW_FACTOR
+    ) -> Canvas:
+        """
+        Quickly draw a coarse preview of a constructed piece.
+
+        Each cell is downsampled by factor to a small block and every visible
+        pentagon is painted as the pair of block triangles either side of the
+        edge it straddles. No pentagon geometry is rasterized; the blocks are
+        read straight from each layer's visibility arrays.
+
+        Arguments:
+            piece (Piece): a piece whose layers have been constructed.
+            factor (int): how many times smaller than a full render to draw.
+
+        Returns:
+            The preview Canvas.
+
+        Raises:
+            ValueError: if factor is less than 1.
+        """
+        if factor < 1:
+            raise ValueError("The preview factor must be at least 1.")
+        return self._render_blocks(piece, max(self.cell_size // factor, 1))
+
+    def render_at_zoom(self, piece, zoom: float = 1.0) -> Canvas:
+        """
+        Render a piece with a level of detail suited to zoom.
+
+        Full pentagon geometry is only drawn once a cell spans at least
+        constants.FULL_DETAIL_CELL_SIZE pixels; below that, the block preview
+        is indistinguishable and far cheaper.
+        """
+        cell_size = max(round(self.cell_size * zoom), 1)
+        if cell_size >= constants.FULL_DETAIL_CELL_SIZE:
+            return Renderer(cell_size).render(piece)
+        return self._render_blocks(piece, cell_size)
+
+    def _render_blocks(self, piece, block: int) -> Canvas:
+        if not piece.layers:
+            raise RuntimeError("The piece has no layers to render.")
+        canvas = Canvas(
+            piece.width * block,
+            piece.height * block,
+            piece.background_color or constants.Colors.WHITE,
+        )
+        spans = block_spans(block)
+        for this_layer in piece.layers:
+            tables = blend_tables(this_layer.color, this_layer.opacity)
+            width, height = this_layer.width, this_layer.height
+
+            def paint(row: int, column: int, side: str) -> None:
+                if this_layer.periodic:
+                    row, column = row % height, column % width
+                elif not (0 <= row < height and 0 <= column < width):
+                    return
+                top, left = row * block, column * block
+                for y, start, stop in spans[side]:
+                    canvas.blend(top + y, left + start, left + stop, tables)
+
+            vertical, horizontal = this_layer.visibility_arrays()
+            for index in (i for i, visible in enumerate(vertical) if visible):
+                row, edge = divmod(index, width + 1)
+                paint(row, edge - 1, "right")
+                paint(row, edge, "left")
+            for index in (i for i, visible in enumerate(horizontal) if visible):
+                edge, column = divmod(index, width)
+                paint(edge - 1, column, "bottom")
+                paint(edge, column, "top")
+        return canvas
+
+    def _render_layer(self, canvas: Canvas, this_layer: layer.Layer) -> None:
+        tables = blend_tables(this_layer.color, this_layer.opacity)
+        for key in this_layer.visible_keys():
+            vertices = [
+                (x * self.cell_size, y * self.cell_size)
+                for x, y in pentagon_vertices(key)
+            ]
+            for shifted in self._wrap(vertices, canvas, this_layer.periodic):
+                for y, start, stop in polygon_spans(
+                    shifted, canvas.width, canvas.height
+                ):
+                    canvas.blend(y, start, stop, tables)
+
+    @staticmethod
+    def _wrap(
+        vertices: List[Point], canvas: Canvas, periodic: bool
+    ) -> Iterator[List[Point]]:
+        """
+        Yield the polygon, and for a periodic layer, its copy on the far side
+        of any seam it straddles.
+        """
+        yield vertices
+        if not periodic:
+            return
+        if max(x for x, _ in vertices) > canvas.width:
+            yield [(x - canvas.width, y) for x, y in vertices]
+        if max(y for _, y in vertices) > canvas.height:
+            yield [(x, y - canvas.height) for x, y in vertices]
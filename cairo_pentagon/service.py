@@ -0,0 +1,346 @@
+"""
+A long-lived asyncio service that generates and renders pieces on request.
+
+Clients connect to a local Unix socket and send one JSON job per line:
+
+    {"id": 1, "seed": 7, "width": 12, "height": 16, "periodic": true,
+     "shape": "alpha", "render": {"cell_size": 32, "tiles": [2, 2]}}
+
+Every field but the seed is optional. Without "render", the result is the
+encoded piece (see cache.encode_piece); with it, a PPM image, or a quick preview
+when "render" holds a "preview_factor". Each result is streamed back, as soon
+as it is ready, as a JSON header line followed by exactly "size" payload bytes:
+
+    {"id": 1, "key": "...", "size": 12345}
+
+Identical jobs in flight at the same time are computed once. The work itself
+runs in a pool of warm worker processes, so a request costs only its compute.
+Jobs are bounded in size, and should a worker die regardless, the jobs it took
+down fail and the pool is replaced for those that follow.
+"""
+import asyncio
+import concurrent.futures
+import json
+import os
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+
+from cairo_pentagon import cache, piece, render
+from cairo_pentagon.utils import constants
+
+Job = Dict[str, Any]
+
+# The caches opened by this worker process, by directory.
+_caches: Dict[str, cache.PieceCache] = {}
+
+
+def _is_integer(value: Any, minimum: int = 1) -> bool:
+    # bool is a subclass of int, but True is no seed or size.
+    return isinstance(value, int) and not isinstance(value, bool) and value >= minimum
+
+
+def normalize_job(request: Job) -> Job:
+    """
+    Fill in the defaults of a job so that equal jobs compare, and hash, equal.
+
+    Every field is checked here, so a bad job is refused before it reaches
+    the process pool.
+
+    Raises:
+        ValueError: if the request is not a valid job.
+    """
+    if not _is_integer(request.get("seed"), minimum=0):
+        raise ValueError("A job requires a non-negative integer 'seed'.")
+    job = {
+        "seed": request["seed"],
+        "width": request.get("width", constants.DEFAULT_PIECE_WIDTH),
+        "height": request.get("height", constants.DEFAULT_PIECE_HEIGHT),
+        "periodic": request.get("periodic", False),
+        "shape": request.get("shape", constants.Shape.ALPHA),
+        "render": None,
+    }
+    if not all(_is_integer(job[field]) for field in ("width", "height")):
+        raise ValueError("A job's 'width' and 'height' must be positive integers.")
+    if not isinstance(job["periodic"], bool):
+        raise ValueError("A job's 'periodic' must be true or false.")
+    if max(job["width"], job["height"]) > constants.MAX_PIECE_SIZE:
+        raise ValueError(
+            f"A job's 'width' and 'height' must be at most {constants.MAX_PIECE_SIZE}."
+        )
+    if job["periodic"] and (job["width"] % 2 or job["height"] % 2):
+        raise ValueError("A periodic job must have an even 'width' and 'height'.")
+    if job["shape"] not in constants.Shape.SHAPES:
+        raise ValueError(f"Unknown shape {job['shape']!r}.")
+
+    settings = request.get("render")
+    if settings is None:
+        return job
+    if not isinstance(settings, dict):
+        raise ValueError("A job's 'render' must be an object of render settings.")
+    job["render"] = {
+        "cell_size": settings.get("cell_size", constants.DEFAULT_CELL_SIZE),
+        "preview_factor": settings.get("preview_factor"),
+        "tiles": settings.get("tiles", [1, 1]),
+    }
+    render_settings = job["render"]
+    if not _is_integer(render_settings["cell_size"]):
+        raise ValueError("The render 'cell_size' must be a positive integer.")
+    if render_settings["preview_factor"] is not None and not _is_integer(
+        render_settings["preview_factor"]
+    ):
+        raise ValueError("The render 'preview_factor' must be a positive integer.")
+    tiles = render_settings["tiles"]
+    if not (
+        isinstance(tiles, (list, tuple))
+        and len(tiles) == 2
+        and all(_is_integer(count) for count in tiles)
+    ):
+        raise ValueError("The render 'tiles' must be two positive integers.")
+    render_settings["tiles"] = list(tiles)
+    if render_settings["tiles"] != [1, 1] and not job["periodic"]:
+        raise ValueError("Only a periodic job can be rendered in 'tiles'.")
+
+    if render_settings["preview_factor"]:
+        # A preview is never tiled, and draws each cell as a smaller block.
+        side = max(render_settings["cell_size"] // render_settings["preview_factor"], 1)
+        columns, rows = 1, 1
+    else:
+        side = render_settings["cell_size"]
+        columns, rows = render_settings["tiles"]
+    pixels = job["width"] * side * columns * job["height"] * side * rows
+    if pixels > constants.MAX_RENDER_PIXELS:
+        raise ValueError(
+            f"A job may render at most {constants.MAX_RENDER_PIXELS} pixels."
+        )
+    return job
+
+
+def run_job(job: Job, cache_directory: Optional[str] = None) -> bytes:
+    """
+    Generate, and optionally render, the piece described by a normalized job.
+
+    This is the unit of work sent to the worker processes. When a cache
+    directory is given, results are looked up in and stored to it.
+    """
+    key = cache.PieceCache.key(**job)
+    piece_cache = None
+    if cache_directory is not None:
+        if cache_directory not in _caches:
+            _caches[cache_directory] = cache.PieceCache(cache_directory)
+        piece_cache = _caches[cache_directory]
+        data = piece_cache.get(key)
+        if data is not None:
+            return data
+
+    this_piece = piece.Piece(
+        width=job["width"],
+        height=job["height"],
+        periodic=job["periodic"],
+        seed=job["seed"],
+    )
+    this_piece.construct_piece(job["shape"])
+
+    settings = job["render"]
+    if settings is None:
+        data = cache.encode_piece(this_piece)
+    else:
+        renderer = render.Renderer(settings["cell_size"])
+        if settings["preview_factor"]:
+            canvas = renderer.render_preview(this_piece, settings["preview_factor"])
+        else:
+            canvas = renderer.render(this_piece, tiles=tuple(settings["tiles"]))
+        data = canvas.to_ppm()
+
+    if piece_cache is not None:
+        piece_cache.put(key, data)
+    return data
+
+
+def _warm() -> None:
+    """Do nothing; submitted once per worker to start it ahead of any job."""
+
+
+class PieceService:
+    """
+    Serves piece jobs over a Unix socket, coalescing identical in-flight jobs
+    and running them in a process pool.
+    """
+
+    def __init__(
+        self,
+        path: str = constants.DEFAULT_SOCKET_PATH,
+        workers: Optional[int] = None,
+        cache_directory: Optional[str] = None,
+    ):
+        self.path: str = path
+        self.workers: Optional[int] = workers
+        self.cache_directory: Optional[str] = cache_directory
+
+        self._pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        # The task serving each open connection, and that connection's writer.
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+        # The number of jobs computed, and joined onto one already in flight.
+        self.computed: int = 0
+        self.coalesced: int = 0
+
+    async def start(self) -> None:
+        """Start the worker processes and begin listening on the socket."""
+        loop = asyncio.get_running_loop()
+        workers = self.workers or os.cpu_count() or 1
+        self._pool = concurrent.futures.ProcessPoolExecutor(workers)
+        await asyncio.gather(
+            *(loop.run_in_executor(self._pool, _warm) for _ in range(workers))
+        )
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # Hang up on open connections and let their handlers finish, rather
+            # than leaving them to be cancelled with the event loop.
+            for writer in self._connections.values():
+                writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def submit(self, job: Job) -> Tuple[str, bytes]:
+        """
+        Return the key and result of a normalized job, sharing the computation
+        with any identical job already in flight.
+        """
+        key = cache.PieceCache.key(**job)
+        future = self._in_flight.get(key)
+        if future is None:
+            self.computed += 1
+            future = asyncio.ensure_future(self._run(job))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shield the shared computation from a single requester's cancellation.
+        return key, await asyncio.shield(future)
+
+    async def _run(self, job: Job) -> bytes:
+        """Run a job in the process pool, replacing the pool if it breaks."""
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        try:
+            future = loop.run_in_executor(pool, run_job, job, self.cache_directory)
+        except BrokenProcessPool:
+            # The pool broke before this job reached it; run it on a fresh one.
+            pool = self._replace_pool(pool)
+            future = loop.run_in_executor(pool, run_job, job, self.cache_directory)
+        try:
+            return await future
+        except BrokenProcessPool:
+            # A worker died, perhaps running this very job, so the job fails
+            # rather than being retried; the jobs that follow get a fresh pool.
+            self._replace_pool(pool)
+            raise
+
+    def _replace_pool(
+        self, broken: concurrent.futures.ProcessPoolExecutor
+    ) -> concurrent.futures.ProcessPoolExecutor:
+        """Swap a broken process pool for a new one, unless already swapped."""
+        if self._pool is broken:
+            broken.shutdown(wait=False)
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                self.workers or os.cpu_count() or 1
+            )
+        return self._pool
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._connections[asyncio.current_task()] = writer
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ConnectionError:
+                    break
+                if not line:
+                    break
+                task = asyncio.create_task(self._respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            # A failure answering one job must not take the connection's other
+            # jobs, or the server, down with it.
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+            self._connections.pop(asyncio.current_task(), None)
+
+    async def _respond(self, line: bytes, writer: asyncio.StreamWriter) -> None:
+        request: Job = {}
+        try:
+            parsed = json.loads(line)
+            if not isinstance(parsed, dict):
+                raise ValueError("A job must be a JSON object.")
+            request = parsed
+            key, data = await self.submit(normalize_job(request))
+            header = {"id": request.get("id"), "key": key, "size": len(data)}
+        except Exception as error:
+            data = b""
+            header = {"id": request.get("id"), "error": str(error), "size": 0}
+        if writer.is_closing():
+            return
+        # Header and payload go out in one write, so concurrent responses on a
+        # connection never interleave.
+        writer.write(json.dumps(header).encode("utf-8") + b"\n" + data)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            # The client went away before its result was ready, e.g. a preview
+            # browser paging on; the result is simply dropped.
+            pass
+
+
+async def request(
+    path: str = constants.DEFAULT_SOCKET_PATH, **job: Any
+) -> Tuple[Dict[str, Any], bytes]:
+    """
+    Send a single job to a running service and wait for its result.
+
+    Returns:
+        The response header and the payload bytes.
+    """
+    reader, writer = await asyncio.open_unix_connection(path)
+    try:
+        writer.write(json.dumps(job).encode("utf-8") + b"\n")
+        await writer.drain()
+        header = json.loads(await reader.readline())
+        data = await reader.readexactly(header["size"])
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    return header, data
+
+
+def serve(
+    path: str = constants.DEFAULT_SOCKET_PATH,
+    workers: Optional[int] = None,
+    cache_directory: Optional[str] = None,
+) -> None:
+    """Run a PieceService until interrupted."""
+    service = PieceService(path, workers=workers, cache_directory=cache_directory)
+    asyncio.run(service.serve_forever())
@@ -0,0 +1,184 @@
+"""
+Hands finished pieces between processes through shared memory.
+
+A worker packs the visibility of every layer directly into a shared memory
+block and returns a small PieceDescriptor; the parent attaches to the block and
+reads the layers in place. Pentagon geometry is never transferred, since it is
+recovered from each pentagon's unique key.
+
+A block belongs to no process between export_piece and its attachment, so
+nothing frees it automatically: a descriptor that will never be attached, say
+because a sibling task failed, must be passed to release_descriptor, or the
+block stays in /dev/shm until reboot. Collect descriptors one result at a time,
+e.g. with apply_async, rather than with Pool.map, which drops the descriptors
+of every successful task when one task fails.
+"""
+import os
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, NamedTuple, Optional, Tuple
+
+from cairo_pentagon import layer, piece
+from cairo_pentagon.utils import typing
+
+
+class LayerDescriptor(NamedTuple):
+    init_shape: typing.Shape
+    width: typing.Width
+    height: typing.Height
+    color: typing.Color
+    opacity: typing.Opacity
+    periodic: bool
+    offset: int
+
+
+class PieceDescriptor(NamedTuple):
+    name: str
+    width: typing.Width
+    height: typing.Height
+    periodic: bool
+    seed: int
+    background_color: Optional[typing.Color]
+    layers: Tuple[LayerDescriptor, ...]
+
+
+def export_piece(this_piece: piece.Piece) -> PieceDescriptor:
+    """
+    Write the layers of a constructed piece into a new shared memory block.
+
+    The block is handed over to whoever attaches to the returned descriptor,
+    who becomes responsible for releasing it, so it outlives this process.
+    A descriptor that is never attached must be freed with release_descriptor.
+
+    Arguments:
+        this_piece (Piece): a piece whose layers have been constructed.
+
+    Returns:
+        The PieceDescriptor naming the block and the layout of its layers.
+    """
+    size = sum(sum(l.visibility_sizes) for l in this_piece.layers)
+    memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+    descriptors: List[LayerDescriptor] = []
+    offset = 0
+    try:
+        for this_layer in this_piece.layers:
+            vertical_size, horizontal_size = this_layer.visibility_sizes
+            middle = offset + vertical_size
+            end = middle + horizontal_size
+            # The views must be released, even on failure, before the block can
+            # be closed.
+            with memory.buf[offset:middle] as vertical:
+                with memory.buf[middle:end] as horizontal:
+                    this_layer.pack_visibility(vertical, horizontal)
+            descriptors.append(
+                LayerDescriptor(
+                    init_shape=this_layer.shape,
+                    width=this_layer.width,
+                    height=this_layer.height,
+                    color=this_layer.color,
+                    opacity=this_layer.opacity,
+                    periodic=this_layer.periodic,
+                    offset=offset,
+                )
+            )
+            offset = end
+    except BaseException:
+        memory.close()
+        memory.unlink()
+        raise
+
+    # Ownership passes to the attaching process; stop this one's resource
+    # tracker from unlinking the block when it exits. The tracker only runs on
+    # POSIX, where it records the name with its leading slash.
+    if os.name == "posix":
+        resource_tracker.unregister(f"/{memory.name}", "shared_memory")
+    memory.close()
+    return PieceDescriptor(
+        name=memory.name,
+        width=this_piece.width,
+        height=this_piece.height,
+        periodic=this_piece.periodic,
+        seed=this_piece.seed,
+        background_color=this_piece.background_color,
+        layers=tuple(descriptors),
+    )
+
+
+def release_descriptor(descriptor: PieceDescriptor) -> None:
+    """
+    Free the shared memory block named by a descriptor without attaching to
+    it, e.g. when the task that was to consume it fails. Releasing a block that
+    is already gone is harmless.
+    """
+    try:
+        memory = shared_memory.SharedMemory(name=descriptor.name)
+    except FileNotFoundError:
+        return
+    memory.close()
+    memory.unlink()
+
+
+class AttachedPiece:
+    """
+    A piece whose layers read their visibility straight out of the shared
+    memory block named by a PieceDescriptor, without copying it.
+
+    Use it as a context manager, or call release, to free the block.
+    """
+
+    def __init__(self, descriptor: PieceDescriptor):
+        self.piece = piece.Piece(
+            width=descriptor.width,
+            height=descriptor.height,
+            periodic=descriptor.periodic,
+            seed=descriptor.seed,
+        )
+        self.piece.background_color = descriptor.background_color
+
+        self._memory = shared_memory.SharedMemory(name=descriptor.name)
+        self._views: List[memoryview] = []
+        try:
+            self.piece.layers = [
+                self._attach_layer(layer_descriptor)
+                for layer_descriptor in descriptor.layers
+            ]
+        except BaseException:
+            # Nobody else will ever attach to the block; free it here.
+            self.release()
+            raise
+
+    def __enter__(self) -> piece.Piece:
+        return self.piece
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    def _attach_layer(self, descriptor: LayerDescriptor) -> layer.Layer:
+        vertical_size = descriptor.height * (descriptor.width + 1)
+        horizontal_size = (descriptor.height + 1) * descriptor.width
+        middle = descriptor.offset + vertical_size
+        vertical = self._memory.buf[descriptor.offset : middle]
+        horizontal = self._memory.buf[middle : middle + horizontal_size]
+        self._views.extend((vertical, horizontal))
+        return layer.Layer.from_visibility_arrays(
+            vertical,
+            horizontal,
+            init_shape=descriptor.init_shape,
+            width=descriptor.width,
+            height=descriptor.height,
+            color=descriptor.color,
+            opacity=descriptor.opacity,
+            periodic=descriptor.periodic,
+        )
+
+    def release(self) -> None:
+        """Detach the layers and free the shared memory block."""
+        if self._memory is None:
+            return
+        self.piece.layers = None
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._memory.close()
+        self._memory.unlink()
+        self._memory = None
@@ -1,21 +1,21 @@
-from enum import Enum
 from typing import List
 
 from cairo_pentagon.utils import typing
 
 
-class Colors(Enum):
+class Colors:
     BLUE: typing.Color = (0, 0, 255)
     GREEN: typing.Color = (0, 255, 0)
     RED: typing.Color = (255, 0, 0)
+    WHITE: typing.Color = (255, 255, 255)
 
 
-class DimensionalOffset(Enum):
+class DimensionalOffset:
     POSITIVE: typing.Coordinates = (0, 1)
     NEGATIVE: typing.Coordinates = (-1, 0)
 
 
-class Orientation(Enum):
+class Orientation:
     UP: typing.Orientation = 'up'
     DOWN: typing.Orientation = 'down'
     LEFT: typing.Orientation = 'left'
@@ -24,23 +24,23 @@ class Orientation(Enum):
     HORIZONTAL: List[typing.Orientation] = [LEFT, RIGHT]
 
 
-class Pattern(Enum):
+class Pattern:
     SQUARE = 'square'
 
 
-class Shape(Enum):
+class Shape:
     ALPHA: typing.Shape = 'alpha'
     BETA: typing.Shape = 'beta'
     SHAPES: List[typing.Shape] = [ALPHA, BETA]
 
 
-class Space(Enum):
+class Space:
     POSITIVE: typing.Shape = 'positive'
     NEGATIVE: typing.Shape = 'negative'
     SPACES: List[typing.Shape] = [POSITIVE, NEGATIVE]
 
 
-class Spin(Enum):
+class Spin:
     CLOCKWISE: typing.Spin = 'clockwise'
     COUNTER_CLOCKWISE: typing.Spin = 'counter_clockwise'
     SPINS: List[typing.Spin] = [CLOCKWISE, COUNTER_CLOCKWISE]
@@ -49,3 +49,14 @@ class Spin(Enum):
 DEFAULT_OPACITY: typing.Opacity = 0.25
 DEFAULT_HEIGHT: typing.Height = 4
 DEFAULT_WIDTH: typing.Width = 4
+DEFAULT_PIECE_HEIGHT: typing.Height = 15
+DEFAULT_PIECE_WIDTH: typing.Width = 12
+DEFAULT_CELL_SIZE: int = 32
+DEFAULT_PREVIEW_FACTOR: int = 8
+# The smallest on-screen cell, in pixels, drawn with full pentagon geometry.
+FULL_DETAIL_CELL_SIZE: int = 16
+DEFAULT_CACHE_BYTES: int = 256 * 1024 * 1024
+DEFAULT_SOCKET_PATH: str = "/tmp/cairo_pentagon.sock"
+# The largest job the service accepts, so one request cannot exhaust a worker.
+MAX_PIECE_SIZE: int = 256
+MAX_RENDER_PIXELS: int = 4096 * 4096
@@ -20,9 +20,11 @@ class Randomizer:
     _colors = [constants.Colors.RED, constants.Colors.GREEN, constants.Colors.BLUE]
 
     def __init__(self, seed: Optional[int] = None):
-        self.seed = seed if seed else _SEED
-        random.seed(self.seed)
-        random.shuffle(self._colors)
+        self.seed = seed if seed is not None else _SEED
+        # A private generator keeps each piece reproducible from its seed alone.
+        self._random = random.Random(self.seed)
+        self._colors = list(self._colors)
+        self._random.shuffle(self._colors)
 
     @property
     def seed(self) -> int:
@@ -33,15 +35,14 @@ class Randomizer:
         self._seed = value
 
     def get_random_attribute(self, attribute: str) -> Any:
-        return random.choice(self._attribute_map[attribute])
+        return self._random.choice(self._attribute_map[attribute])
 
     def get_color(self):
         if not self._colors:
             raise RuntimeError("All colors have been exhausted.")
         return self._colors.pop()
 
-    @staticmethod
-    def get_origin(height: int, width: int):
-        row = random.randint(0, height)
-        column = random.randint(0, width)
+    def get_origin(self, height: int, width: int):
+        row = self._random.randint(0, height)
+        column = self._random.randint(0, width)
         return row, column
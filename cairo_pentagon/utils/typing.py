@@ -1,6 +1,7 @@
 from typing import Callable, Dict, Iterable, Optional, Tuple, Union
 
 
+Buffer = Union[bytearray, memoryview]
 Color = Tuple[int, int, int]
 Column = Optional[Union[int, Tuple[int, int]]]
 CoordinateMap = Dict[str, Dict[str, Callable[[Iterable[int]], int]]]
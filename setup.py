@@ -8,5 +8,8 @@ setup(
     license='',
     author='Andrew',
     author_email='andrewtheis4@gmail.com',
-    description='An exploration of pattern and probability.'
+    description='An exploration of pattern and probability.',
+    entry_points={
+        'console_scripts': ['cairo-pentagon=cairo_pentagon.cli:main'],
+    },
 )
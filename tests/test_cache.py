@@ -0,0 +1,109 @@
+import os
+
+from cairo_pentagon.cache import PieceCache
+from cairo_pentagon.piece import Piece
+from cairo_pentagon.render import Renderer
+
+
+def _build_piece(seed):
+    piece = Piece(width=6, height=4, periodic=True, seed=seed)
+    piece._add_layers()
+    piece._add_patterns()
+    piece.apply_patterns()
+    return piece
+
+
+def test_key():
+    key = PieceCache.key(seed=1, width=6, height=4)
+    assert key == PieceCache.key(height=4, width=6, seed=1)
+    assert key != PieceCache.key(seed=2, width=6, height=4)
+
+
+def test_get_and_put(tmp_path):
+    cache = PieceCache(str(tmp_path))
+    key = PieceCache.key(seed=1)
+    assert cache.get(key) is None
+    cache.put(key, b'rendered')
+    assert cache.get(key) == b'rendered'
+    # Nothing but the entry itself is left behind.
+    assert os.listdir(tmp_path / key[:2]) == [key]
+
+
+def test_get_and_put_piece(tmp_path):
+    cache = PieceCache(str(tmp_path))
+    piece = _build_piece(seed=11)
+    key = PieceCache.key(seed=11, width=6, height=4, periodic=True)
+    cache.put_piece(key, piece)
+
+    cached = cache.get_piece(key)
+    assert (cached.width, cached.height, cached.seed) == (6, 4, 11)
+    for cached_layer, layer in zip(cached.layers, piece.layers):
+        assert cached_layer.color == layer.color
+        assert [bytes(a) for a in cached_layer.visibility_arrays()] == [
+            bytes(a) for a in layer.visibility_arrays()
+        ]
+    renderer = Renderer(cell_size=8)
+    assert renderer.render(cached).planes == renderer.render(piece).planes
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = PieceCache(str(tmp_path), max_bytes=250)
+    first, second, third = (PieceCache.key(seed=seed) for seed in range(3))
+    cache.put(first, bytes(100))
+    cache.put(second, bytes(100))
+    os.utime(cache._path(first), (1, 1))
+    os.utime(cache._path(second), (2, 2))
+    # Reading the older entry makes it the most recently used.
+    assert cache.get(first) is not None
+    cache.put(third, bytes(100))
+    assert cache.get(second) is None
+    assert cache.get(first) is not None
+    assert cache.get(third) is not None
+
+
+def test_pieces_are_reproducible_from_seed():
+    first, second = _build_piece(seed=5), _build_piece(seed=5)
+    assert [l.visibility_arrays() for l in first.layers] == [
+        l.visibility_arrays() for l in second.layers
+    ]
+
+
+def test_size_is_bounded_across_instances(tmp_path):
+    # Each instance stands in for a separate worker sharing the directory.
+    caches = [PieceCache(str(tmp_path), max_bytes=1000) for _ in range(4)]
+    for index in range(40):
+        caches[index % 4].put(PieceCache.key(seed=index), bytes(100))
+        total = sum(path.stat().st_size for path in tmp_path.glob('*/*'))
+        assert total <= 1000
+
+
+def test_puts_do_not_rescan_the_cache(tmp_path, monkeypatch):
+    cache = PieceCache(str(tmp_path), max_bytes=8000)
+    scans = []
+    evict = cache._evict
+
+    def counting(target):
+        scans.append(target)
+        return evict(target)
+
+    monkeypatch.setattr(cache, '_evict', counting)
+    for index in range(200):
+        cache.put(PieceCache.key(seed=index), bytes(100))
+    total = sum(path.stat().st_size for path in tmp_path.glob('*/*'))
+    assert total <= 8000
+    # One scan to find the initial size, then one per eighth of the limit.
+    assert len(scans) <= 1 + 200 * 100 // 1000
+
+
+def test_get_survives_concurrent_eviction(tmp_path, monkeypatch):
+    cache = PieceCache(str(tmp_path))
+    key = PieceCache.key(seed=1)
+    cache.put(key, b'rendered')
+
+    def evicted(path, *args):
+        os.unlink(path)
+        raise FileNotFoundError(path)
+
+    # Another process evicts the entry between reading and touching it.
+    monkeypatch.setattr(os, 'utime', evicted)
+    assert cache.get(key) == b'rendered'
@@ -0,0 +1,130 @@
+import argparse
+import io
+import json
+
+import pytest
+
+from cairo_pentagon.cli import (
+    Throughput, _imap_bounded, main, parse_seeds, positive_int
+)
+
+
+@pytest.mark.parametrize('value,seeds', [('4', range(4)), ('2:5', range(2, 5))])
+def test_parse_seeds(value, seeds):
+    assert parse_seeds(value) == seeds
+
+
+@pytest.mark.parametrize('value', ['a:b', '5:5', ''])
+def test_parse_seeds_rejects_invalid_ranges(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_seeds(value)
+
+
+def _records(path):
+    with open(path) as stream:
+        return [json.loads(line) for line in stream]
+
+
+@pytest.mark.parametrize('workers', ['1', '2'])
+def test_main(tmp_path, capsys, workers):
+    output = tmp_path / 'pieces.jsonl'
+    images = tmp_path / 'images'
+    code = main([
+        '--seeds', '3:6', '--width', '4', '--height', '4', '--score',
+        '--render', str(images), '--cell-size', '4', '--output', str(output),
+        '--workers', workers,
+    ])
+    assert code == 0
+
+    records = _records(output)
+    assert [record['seed'] for record in records] == [3, 4, 5]
+    assert all(0 <= record['score'] <= 1 for record in records)
+    assert all(record['pentagons'] == 3 * 40 for record in records)
+    assert set(records[0]['timings']) == {'construct', 'score', 'render'}
+    assert sorted(p.name for p in images.iterdir()) == ['3.ppm', '4.ppm', '5.ppm']
+    # The last throughput report covers the whole batch.
+    assert 'pieces/s' in capsys.readouterr().err.splitlines()[-1]
+
+
+def test_main_filters_and_caches(tmp_path):
+    output = tmp_path / 'pieces.jsonl'
+    arguments = [
+        '--seeds', '4', '--width', '4', '--height', '4', '--periodic',
+        '--cache', str(tmp_path / 'cache'), '--output', str(output),
+        '--workers', '1',
+    ]
+    assert main(arguments + ['--min-score', '1.1']) == 0
+    assert _records(output) == []
+
+    assert main(arguments + ['--with-piece']) == 0
+    first = _records(output)
+    assert main(arguments + ['--with-piece']) == 0
+    assert [r['piece'] for r in _records(output)] == [r['piece'] for r in first]
+    assert len(list((tmp_path / 'cache').glob('*/*'))) == 4
+
+
+def test_main_rejects_tiles_without_periodic():
+    with pytest.raises(SystemExit):
+        main(['--tiles', '2', '2'])
+
+
+@pytest.mark.parametrize('value', ['0', '-2', 'x'])
+def test_positive_int_rejects_invalid_values(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        positive_int(value)
+
+
+@pytest.mark.parametrize(
+    'arguments',
+    [
+        ['--width', '0'],
+        ['--height', '-4'],
+        ['--width', '100000'],
+        ['--cell-size', '0'],
+        ['--preview-factor', '0'],
+        ['--workers', '-1'],
+    ],
+)
+def test_main_rejects_invalid_sizes(arguments):
+    with pytest.raises(SystemExit):
+        main(arguments)
+
+
+class _Result:
+    def __init__(self, batch):
+        self.batch = batch
+
+    def get(self):
+        return list(self.batch)
+
+
+class _Pool:
+    """Runs nothing; records the batches of seeds submitted to it."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def apply_async(self, func, args):
+        self.submitted.extend(args[0])
+        return _Result(args[0])
+
+
+def test_imap_bounded_submits_a_bounded_window():
+    pool = _Pool()
+    records = _imap_bounded(pool, range(10000), workers=2)
+    assert next(records) == 0
+    # Four batches of at most 64 seeds per worker.
+    assert len(pool.submitted) <= 2 * 4 * 64
+    assert list(records) == list(range(1, 10000))
+    assert pool.submitted == list(range(10000))
+
+
+def test_throughput_averages_each_stage_over_its_own_runs():
+    stream = io.StringIO()
+    throughput = Throughput(stream)
+    throughput.add({'pentagons': 1, 'timings': {'construct': 0.002}}, False)
+    throughput.add(
+        {'pentagons': 1, 'timings': {'construct': 0.004, 'render': 0.010}}, True
+    )
+    throughput.report()
+    assert 'construct 3.00ms render 10.00ms' in stream.getvalue()
@@ -42,3 +42,45 @@ def test_construct_layer():
         (constants.Orientation.RIGHT, (0, 1), 0)
     ]
     assert all(key in layer.pentagon_map for key in keys)
+
+
+def test_periodic_layer_requires_even_dimensions():
+    with pytest.raises(ValueError):
+        Layer(width=3, height=4, periodic=True)
+
+
+def test_construct_periodic_layer():
+    # Every cell has four edges, each shared with one neighbour, so a toroidal
+    # layer holds exactly two pentagons per cell.
+    layer = Layer(width=4, height=6, periodic=True)
+    layer.construct_layer()
+    assert len(layer.pentagon_map) == 2 * 4 * 6
+    # Pentagons on the seam are identified with the opposite edge.
+    assert (constants.Orientation.DOWN, 0, (3, 0)) in layer.pentagon_map
+    assert (constants.Orientation.LEFT, (5, 0), 0) in layer.pentagon_map
+    assert all(
+        -1 not in dimension
+        for _, row, column in layer.pentagon_map
+        for dimension in (row, column)
+        if isinstance(dimension, tuple)
+    )
+
+
+def test_visibility_arrays():
+    layer = Layer(width=2, height=2)
+    layer.construct_layer()
+    key = (constants.Orientation.UP, 1, (-1, 0))
+    layer.pentagon_map[key].visibility = False
+    vertical, horizontal = layer.visibility_arrays()
+    assert len(vertical) == 2 * 3
+    assert len(horizontal) == 3 * 2
+    assert list(vertical) == [1, 1, 1, 0, 1, 1]
+    assert all(horizontal)
+
+
+@pytest.mark.parametrize('periodic', [True, False])
+def test_pentagon_count(periodic):
+    layer = Layer(width=4, height=6, periodic=periodic)
+    layer.construct_layer()
+    assert layer.pentagon_count == len(layer.pentagon_map)
+    assert layer.visible_fraction() == 1.0
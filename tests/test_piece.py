@@ -0,0 +1,55 @@
+import pytest
+
+from cairo_pentagon.piece import Piece
+
+
+def _visibility(piece):
+    return [
+        [bytes(array) for array in layer.visibility_arrays()]
+        for layer in piece.layers
+    ]
+
+
+def test_construct_piece():
+    piece = Piece(width=6, height=4, seed=3)
+    piece.construct_piece()
+    assert len(piece.layers) == 3
+    assert len(piece.patterns) == 3
+    for layer in piece.layers:
+        assert len(layer.pentagon_map) == layer.pentagon_count
+    # Each layer draws its own color from the randomizer.
+    assert len(set(layer.color for layer in piece.layers)) == 3
+
+
+def test_construct_piece_is_reproducible_from_seed():
+    first, second = Piece(width=6, height=4, seed=3), Piece(width=6, height=4, seed=3)
+    first.construct_piece()
+    second.construct_piece()
+    assert _visibility(first) == _visibility(second)
+
+    others = []
+    for seed in range(4, 8):
+        other = Piece(width=6, height=4, seed=seed)
+        other.construct_piece()
+        others.append(_visibility(other))
+    assert any(visibility != _visibility(first) for visibility in others)
+
+
+def test_construct_piece_refuses_to_overwrite():
+    piece = Piece(width=6, height=4)
+    piece.construct_piece()
+    with pytest.raises(RuntimeError):
+        piece.construct_piece()
+
+
+def test_coverage():
+    piece = Piece(width=6, height=4, seed=3)
+    piece.construct_piece()
+    fractions = [layer.visible_fraction() for layer in piece.layers]
+    assert piece.coverage() == pytest.approx(sum(fractions) / 3)
+
+    for pentagon in piece.layers[0].pentagon_map.values():
+        pentagon.visibility = False
+    for pentagon in piece.layers[1].pentagon_map.values():
+        pentagon.visibility = True
+    assert piece.coverage() == pytest.approx((0 + 1 + fractions[2]) / 3)
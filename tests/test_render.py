@@ -0,0 +1,107 @@
+import pytest
+
+from cairo_pentagon.layer import Layer
+from cairo_pentagon.piece import Piece
+from cairo_pentagon.render import (
+    Canvas, Renderer, block_spans, pentagon_vertices
+)
+from cairo_pentagon.utils import constants
+
+
+def _piece(width, height, periodic, opacity=0.5):
+    layer = Layer(width=width, height=height, periodic=periodic, opacity=opacity)
+    layer.construct_layer()
+    piece = Piece(width=width, height=height, periodic=periodic)
+    piece.layers = [layer]
+    return piece
+
+
+def test_pentagon_vertices():
+    vertices = pentagon_vertices((constants.Orientation.UP, 0, (0, 1)))
+    assert len(vertices) == 5
+    # Both ends of the shared edge are vertices of the pentagon.
+    assert (1, 0) in vertices
+    assert (1, 1) in vertices
+
+
+@pytest.mark.parametrize('periodic', [True, False])
+def test_render_covers_canvas_exactly_once(periodic):
+    # A half-opaque red layer over white: a gap would leave a white pixel and
+    # an overlap a darker one.
+    canvas = Renderer(cell_size=8).render(_piece(4, 4, periodic))
+    expected = (255, 128, 128)
+    assert all(
+        canvas.pixel(x, y) == expected
+        for x in range(canvas.width)
+        for y in range(canvas.height)
+    )
+
+
+def test_render_tiles_periodic_piece():
+    renderer = Renderer(cell_size=8)
+    tiled = renderer.render(_piece(4, 2, True, opacity=1.0), tiles=(2, 3))
+    whole = renderer.render(_piece(8, 6, True, opacity=1.0))
+    assert (tiled.width, tiled.height) == (whole.width, whole.height)
+    assert tiled.planes == whole.planes
+
+
+def test_render_refuses_to_tile_bounded_piece():
+    with pytest.raises(RuntimeError):
+        Renderer(cell_size=8).render(_piece(4, 4, False), tiles=(2, 2))
+
+
+@pytest.mark.parametrize('block', [1, 2, 5, 8])
+def test_block_spans_partition_block(block):
+    covered = sorted(
+        (y, x)
+        for spans in block_spans(block).values()
+        for y, start, stop in spans
+        for x in range(start, stop)
+    )
+    assert covered == [(y, x) for y in range(block) for x in range(block)]
+
+
+@pytest.mark.parametrize('periodic', [True, False])
+def test_render_preview_covers_canvas_exactly_once(periodic):
+    canvas = Renderer(cell_size=32).render_preview(_piece(4, 4, periodic), factor=8)
+    assert (canvas.width, canvas.height) == (16, 16)
+    assert set(
+        canvas.pixel(x, y) for x in range(canvas.width) for y in range(canvas.height)
+    ) == {(255, 128, 128)}
+
+
+def test_render_preview_skips_hidden_pentagons():
+    piece = _piece(4, 4, False, opacity=1.0)
+    for pentagon in piece.layers[0].pentagon_map.values():
+        pentagon.visibility = False
+    canvas = Renderer(cell_size=32).render_preview(piece)
+    assert set(canvas.planes[1]) == {255}
+
+
+@pytest.mark.parametrize('factor', [0, -2])
+def test_render_preview_rejects_factor_below_one(factor):
+    with pytest.raises(ValueError):
+        Renderer(cell_size=32).render_preview(_piece(4, 4, False), factor=factor)
+
+
+def test_render_at_zoom_switches_detail():
+    renderer = Renderer(cell_size=32)
+    piece = _piece(4, 4, False)
+    zoomed_in = renderer.render_at_zoom(piece, zoom=0.5)
+    assert zoomed_in.planes == Renderer(cell_size=16).render(piece).planes
+    zoomed_out = renderer.render_at_zoom(piece, zoom=0.25)
+    assert zoomed_out.planes == renderer.render_preview(piece, factor=4).planes
+
+
+def test_canvas_tile():
+    canvas = Canvas(2, 1)
+    canvas.blend(0, 0, 1, [bytes(256)] * 3)
+    tiled = canvas.tile(3, 2)
+    assert (tiled.width, tiled.height) == (6, 2)
+    assert [tiled.pixel(x, 1) for x in range(2)] == [(0, 0, 0), (255, 255, 255)]
+    assert tiled.pixel(4, 0) == (0, 0, 0)
+
+
+def test_to_ppm():
+    data = Canvas(2, 1, color=(1, 2, 3)).to_ppm()
+    assert data == b'P6\n2 1\n255\n' + bytes([1, 2, 3, 1, 2, 3])
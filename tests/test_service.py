@@ -0,0 +1,163 @@
+import asyncio
+import json
+import os
+import signal
+
+import pytest
+
+from cairo_pentagon.cache import decode_piece
+from cairo_pentagon.piece import Piece
+from cairo_pentagon.render import Renderer
+from cairo_pentagon.service import PieceService, normalize_job, request, run_job
+
+
+def test_normalize_job():
+    job = normalize_job({'seed': 3, 'render': {}})
+    assert job == {
+        'seed': 3,
+        'width': 12,
+        'height': 15,
+        'periodic': False,
+        'shape': 'alpha',
+        'render': {'cell_size': 32, 'preview_factor': None, 'tiles': [1, 1]},
+    }
+    assert normalize_job({'seed': 3, 'width': 12}) == normalize_job({'seed': 3})
+    job = normalize_job(
+        {'seed': 3, 'width': 4, 'height': 4, 'periodic': True,
+         'render': {'tiles': (2, 2), 'preview_factor': 4}}
+    )
+    assert job['render'] == {'cell_size': 32, 'preview_factor': 4, 'tiles': [2, 2]}
+
+
+@pytest.mark.parametrize(
+    'request_',
+    [
+        {},
+        {'seed': '3'},
+        {'seed': True},
+        {'seed': 3, 'width': 0},
+        {'seed': 3, 'width': 100000},
+        {'seed': 3, 'width': 3, 'periodic': True},
+        {'seed': 3, 'periodic': 'false'},
+        {'seed': 3, 'periodic': 0.0},
+        {'seed': 3, 'periodic': None},
+        {'seed': 3, 'shape': 'x'},
+        {'seed': 3, 'render': 1},
+        {'seed': 3, 'render': {'cell_size': '32'}},
+        {'seed': 3, 'render': {'cell_size': True}},
+        {'seed': 3, 'render': {'preview_factor': 0}},
+        {'seed': 3, 'render': {'tiles': 2}},
+        {'seed': 3, 'render': {'tiles': [2, 'x']}},
+        {'seed': 3, 'render': {'tiles': [2, 2]}},
+        {'seed': 3, 'render': {'cell_size': 4096}},
+        {'seed': 3, 'width': 4, 'height': 4, 'periodic': True,
+         'render': {'tiles': [1000, 1000]}},
+    ],
+)
+def test_normalize_job_rejects_invalid_jobs(request_):
+    with pytest.raises(ValueError):
+        normalize_job(request_)
+
+
+def test_run_job():
+    piece = Piece(width=4, height=6, seed=9)
+    piece.construct_piece()
+
+    job = normalize_job({'seed': 9, 'width': 4, 'height': 6})
+    decoded = decode_piece(run_job(job))
+    assert [l.visibility_arrays() for l in decoded.layers] == [
+        l.visibility_arrays() for l in piece.layers
+    ]
+
+    job = normalize_job({'seed': 9, 'width': 4, 'height': 6, 'render': {}})
+    assert run_job(job) == Renderer().render(piece).to_ppm()
+
+
+def test_run_job_uses_cache(tmp_path):
+    job = normalize_job({'seed': 9, 'width': 4, 'height': 6})
+    first = run_job(job, cache_directory=str(tmp_path))
+    assert run_job(job, cache_directory=str(tmp_path)) == first
+    assert len(list(tmp_path.glob('*/*'))) == 1
+
+
+def test_service(tmp_path):
+    path = str(tmp_path / 'service.sock')
+
+    async def scenario():
+        service = PieceService(path, workers=1)
+        await service.start()
+        try:
+            job = {'seed': 4, 'width': 4, 'height': 4}
+            # Identical jobs in flight together are computed once.
+            results = await asyncio.gather(
+                service.submit(normalize_job(job)), service.submit(normalize_job(job))
+            )
+            assert results[0] == results[1]
+            assert (service.computed, service.coalesced) == (1, 1)
+
+            header, data = await request(path, id=7, render={'cell_size': 4}, **job)
+            assert header['id'] == 7
+            assert len(data) == header['size']
+            assert data.startswith(b'P6\n16 16\n255\n')
+
+            header, data = await request(path, id=8)
+            assert header['id'] == 8
+            assert 'error' in header
+            assert data == b''
+        finally:
+            await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_service_survives_dead_worker(tmp_path):
+    path = str(tmp_path / 'service.sock')
+
+    async def scenario():
+        service = PieceService(path, workers=1)
+        await service.start()
+        try:
+            for pid in list(service._pool._processes):
+                os.kill(pid, signal.SIGKILL)
+            # The jobs caught by the dead worker may fail, but not later ones.
+            await request(path, id=1, seed=1, width=4, height=4)
+            for seed in range(2, 4):
+                header, data = await request(
+                    path, id=seed, seed=seed, width=4, height=4
+                )
+                assert 'error' not in header
+                assert header['size'] == len(data) > 0
+        finally:
+            await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_service_survives_client_disconnect(tmp_path):
+    path = str(tmp_path / 'service.sock')
+    errors = []
+
+    async def scenario():
+        asyncio.get_running_loop().set_exception_handler(
+            lambda loop, context: errors.append(context)
+        )
+        service = PieceService(path, workers=1)
+        await service.start()
+        try:
+            job = {'seed': 2, 'width': 12, 'height': 16, 'render': {}}
+            for _ in range(3):
+                # Send a slow job and hang up before its result is ready.
+                _, writer = await asyncio.open_unix_connection(path)
+                writer.write(json.dumps(job).encode('utf-8') + b'\n')
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            await asyncio.sleep(0.5)
+
+            header, data = await request(path, id=1, seed=2, width=4, height=4)
+            assert header['size'] == len(data) > 0
+        finally:
+            await service.close()
+
+    asyncio.run(scenario())
+    assert [c["message"] + repr(c.get("exception")) for c in errors] == []
@@ -0,0 +1,116 @@
+import multiprocessing
+from multiprocessing import shared_memory
+
+import pytest
+
+from cairo_pentagon.cache import decode_piece, encode_piece
+from cairo_pentagon.piece import Piece
+from cairo_pentagon.render import Renderer
+from cairo_pentagon.shared import AttachedPiece, export_piece, release_descriptor
+from cairo_pentagon.utils import constants
+
+
+def _build_piece(periodic):
+    piece = Piece(width=6, height=8, periodic=periodic)
+    piece._add_layers()
+    piece._add_patterns()
+    piece.apply_patterns()
+    return piece
+
+
+def _build_and_export(periodic):
+    return export_piece(_build_piece(periodic))
+
+
+@pytest.mark.parametrize('periodic', [True, False])
+def test_attach_piece_from_worker(periodic):
+    with multiprocessing.Pool(1) as pool:
+        descriptor = pool.apply(_build_and_export, (periodic,))
+    expected = _build_piece(periodic)
+
+    with AttachedPiece(descriptor) as attached:
+        assert (attached.width, attached.height) == (6, 8)
+        for shared_layer, local_layer in zip(attached.layers, expected.layers):
+            assert shared_layer.pentagon_map is None
+            assert [bytes(a) for a in shared_layer.visibility_arrays()] == [
+                bytes(a) for a in local_layer.visibility_arrays()
+            ]
+            assert set(shared_layer.visible_keys()) == set(
+                local_layer.visible_keys()
+            )
+        renderer = Renderer(cell_size=8)
+        assert renderer.render(attached).planes == renderer.render(expected).planes
+
+
+def test_release_frees_shared_memory():
+    descriptor = _build_and_export(False)
+    attached = AttachedPiece(descriptor)
+    attached.release()
+    assert attached.piece.layers is None
+    with pytest.raises(FileNotFoundError):
+        AttachedPiece(descriptor)
+
+
+def test_export_rebuilt_pieces():
+    piece = _build_piece(False)
+    decoded = decode_piece(encode_piece(piece))
+    descriptor = export_piece(decoded)
+    with AttachedPiece(descriptor) as attached:
+        # An attached piece can itself be handed on.
+        with AttachedPiece(export_piece(attached)) as reattached:
+            for shared_layer, local_layer in zip(reattached.layers, piece.layers):
+                assert bytes(shared_layer.visibility_arrays()[0]) == bytes(
+                    local_layer.visibility_arrays()[0]
+                )
+                assert bytes(shared_layer.visibility_arrays()[1]) == bytes(
+                    local_layer.visibility_arrays()[1]
+                )
+
+
+def test_attached_piece_keeps_its_seed():
+    piece = Piece(width=6, height=8, seed=77)
+    piece.construct_piece(constants.Shape.ALPHA)
+    with AttachedPiece(export_piece(piece)) as attached:
+        assert attached.seed == 77
+        assert decode_piece(encode_piece(attached)).seed == 77
+
+
+def test_export_frees_block_on_failure(monkeypatch):
+    piece = _build_piece(False)
+    names = []
+    original = shared_memory.SharedMemory
+
+    def tracking(*args, **kwargs):
+        memory = original(*args, **kwargs)
+        names.append(memory.name)
+        return memory
+
+    def fail(*args):
+        raise RuntimeError('packing failed')
+
+    monkeypatch.setattr(shared_memory, 'SharedMemory', tracking)
+    monkeypatch.setattr(piece.layers[1], 'pack_visibility', fail)
+    with pytest.raises(RuntimeError):
+        export_piece(piece)
+    monkeypatch.undo()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=names[0])
+
+
+def test_release_descriptor_without_attaching():
+    descriptor = _build_and_export(False)
+    release_descriptor(descriptor)
+    with pytest.raises(FileNotFoundError):
+        AttachedPiece(descriptor)
+    # Releasing a block that is already gone is harmless.
+    release_descriptor(descriptor)
+
+
+def test_failed_attach_frees_block():
+    descriptor = _build_and_export(False)
+    # A periodic layer of odd width cannot be built.
+    bad_layer = descriptor.layers[0]._replace(periodic=True, width=5)
+    with pytest.raises(ValueError):
+        AttachedPiece(descriptor._replace(layers=(bad_layer,)))
+    with pytest.raises(FileNotFoundError):
+        AttachedPiece(descriptor)